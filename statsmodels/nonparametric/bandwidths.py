@@ -1,14 +1,13 @@
 from __future__ import division
 
 import numpy as np
-from scipy.stats import scoreatpercentile as sap
 from statsmodels.sandbox.nonparametric import kernels
 
 #from scipy.stats import norm
 
-def _select_sigma(X):
+def _select_sigma(X, axis=0):
     """
-    Returns the smaller of std(X, ddof=1) or normalized IQR(X) over axis 0.
+    Returns the smaller of std(X, ddof=1) or normalized IQR(X) over axis.
 
     References
     ----------
@@ -16,14 +15,12 @@ def _select_sigma(X):
     """
 #    normalize = norm.ppf(.75) - norm.ppf(.25)
     normalize = 1.349
-#    IQR = np.subtract.reduce(percentile(X, [75,25],
-#                             axis=axis), axis=axis)/normalize
-    IQR = (sap(X, 75) - sap(X, 25))/normalize
-    return np.minimum(np.std(X, axis=0, ddof=1), IQR)
+    IQR = np.subtract.reduce(np.percentile(X, [75,25], axis=axis))/normalize
+    return np.minimum(np.std(X, axis=axis, ddof=1), IQR)
 
 
 ## Univariate Rule of Thumb Bandwidths ##
-def bw_scott(x, kernel=None):
+def bw_scott(x, kernel=None, axis=0):
     """
     Scott's Rule of Thumb
 
@@ -33,11 +30,14 @@ def bw_scott(x, kernel=None):
         Array for which to get the bandwidth
     kernel : CustomKernel object
         Unused
+    axis : int
+        Axis along which the bandwidth is computed. The default is 0.
 
     Returns
     -------
-    bw : float
-        The estimate of the bandwidth
+    bw : float or ndarray
+        The estimate of the bandwidth, an array with one bandwidth for each
+        column if `x` is 2d
 
     Notes
     -----
@@ -52,11 +52,11 @@ def bw_scott(x, kernel=None):
     Scott, D.W. (1992) Multivariate Density Estimation: Theory, Practice, and
         Visualization.
     """
-    A = _select_sigma(x)
-    n = len(x)
+    A = _select_sigma(x, axis=axis)
+    n = np.shape(x)[axis]
     return 1.059 * A * n ** (-0.2)
 
-def bw_silverman(x, kernel=None):
+def bw_silverman(x, kernel=None, axis=0):
     """
     Silverman's Rule of Thumb
 
@@ -66,11 +66,14 @@ def bw_silverman(x, kernel=None):
         Array for which to get the bandwidth
     kernel : CustomKernel object
         Unused
+    axis : int
+        Axis along which the bandwidth is computed. The default is 0.
 
     Returns
     -------
-    bw : float
-        The estimate of the bandwidth
+    bw : float or ndarray
+        The estimate of the bandwidth, an array with one bandwidth for each
+        column if `x` is 2d
 
     Notes
     -----
@@ -84,12 +87,12 @@ def bw_silverman(x, kernel=None):
 
     Silverman, B.W. (1986) `Density Estimation.`
     """
-    A = _select_sigma(x)
-    n = len(x)
+    A = _select_sigma(x, axis=axis)
+    n = np.shape(x)[axis]
     return .9 * A * n ** (-0.2)
 
 
-def bw_normal_reference(x, kernel=kernels.Gaussian):
+def bw_normal_reference(x, kernel=kernels.Gaussian, axis=0):
     """
     Plug-in bandwidth with kernel specific constant based on normal reference.
 
@@ -103,11 +106,14 @@ def bw_normal_reference(x, kernel=kernels.Gaussian):
         Array for which to get the bandwidth
     kernel : CustomKernel object
         Used to calculate the constant for the plug-in bandwidth.
+    axis : int
+        Axis along which the bandwidth is computed. The default is 0.
 
     Returns
     -------
-    bw : float
-        The estimate of the bandwidth
+    bw : float or ndarray
+        The estimate of the bandwidth, an array with one bandwidth for each
+        column if `x` is 2d
 
     Notes
     -----
@@ -128,8 +134,8 @@ def bw_normal_reference(x, kernel=kernels.Gaussian):
     Hansen, B.E. (2009) `Lecture Notes on Nonparametrics.`
     """
     C = kernel.normal_reference_constant
-    A = _select_sigma(x)
-    n = len(x)
+    A = _select_sigma(x, axis=axis)
+    n = np.shape(x)[axis]
     return C * A * n ** (-0.2)
 
 ## Plug-In Methods ##
@@ -145,7 +151,7 @@ bandwidth_funcs = {
 }
 
 
-def select_bandwidth(x, bw, kernel):
+def select_bandwidth(x, bw, kernel, axis=0):
     """
     Selects bandwidth for a selection rule bw
 
@@ -159,11 +165,14 @@ def select_bandwidth(x, bw, kernel):
         name of bandwidth selection rule, currently supported are:
         %s
     kernel : not used yet
+    axis : int
+        Axis along which the bandwidth is computed. The default is 0.
 
     Returns
     -------
-    bw : float
-        The estimate of the bandwidth
+    bw : float or ndarray
+        The estimate of the bandwidth, an array with one bandwidth for each
+        column if `x` is 2d
 
     """
     bw = bw.lower()
@@ -171,7 +180,7 @@ def select_bandwidth(x, bw, kernel):
         raise ValueError("Bandwidth %s not understood" % bw)
 #TODO: uncomment checks when we have non-rule of thumb bandwidths for diff. kernels
 #    if kernel == "gauss":
-    return bandwidth_funcs[bw](x, kernel)
+    return bandwidth_funcs[bw](x, kernel, axis=axis)
 #    else:
 #        raise ValueError("Only Gaussian Kernels are currently supported")
 
@@ -13,6 +13,7 @@ Silverman, B.W.  Density Estimation for Statistics and Data Analysis.
 """
 from __future__ import absolute_import, print_function, division
 from statsmodels.compat.python import range
+from statsmodels.compat.scipy import _next_regular
 # for 2to3 with extensions
 import warnings
 
@@ -22,7 +23,7 @@ from statsmodels.sandbox.nonparametric import kernels
 from statsmodels.tools.decorators import (cache_readonly,
                                                     resettable_cache)
 from . import bandwidths
-from .kdetools import (forrt, revrt, silverman_transform, counts)
+from .kdetools import _silverman_factors, _rfft, _irfft
 from .linbin import fast_linbin
 
 #### Kernels Switch for estimators ####
@@ -116,8 +117,8 @@ class KDEUnivariate(object):
         fft : bool
             Whether or not to use FFT. FFT implementation is more
             computationally efficient. However, only the Gaussian kernel
-            is implemented. If FFT is False, then a 'nobs' x 'gridsize'
-            intermediate array is created.
+            is implemented. If FFT is False, then the kernel is evaluated
+            for all 'nobs' x 'gridsize' pairs, in blocks to limit memory.
         gridsize : int
             If gridsize is None, max(len(X), 50) is used.
         cut : float
@@ -267,6 +268,10 @@ class KDEUnivariate(object):
 
 #### Kernel Density Estimator Functions ####
 
+# maximum number of elements of the kernel array that kdensity evaluates at
+# once, 2**20 float64 values are 8 MB
+_kdensity_blocksize = 2**20
+
 def kdensity(X, kernel="gau", bw="normal_reference", weights=None, gridsize=None,
              adjust=1, clip=(-np.inf,np.inf), cut=3, retgrid=True):
     """
@@ -315,12 +320,12 @@ def kdensity(X, kernel="gau", bw="normal_reference", weights=None, gridsize=None
 
     Notes
     -----
-    Creates an intermediate (`gridsize` x `nobs`) array. Use FFT for a more
+    The kernel is evaluated on blocks of grid points of about 2**20 elements
+    (8 MB) each instead of one intermediate (`gridsize` x `nobs`) array,
+    but the work is still proportional to `gridsize` x `nobs`. Use FFT for a more
     computationally efficient version.
     """
-    X = np.asarray(X)
-    if X.ndim == 1:
-        X = X[:,None]
+    X = np.asarray(X).ravel() # univariate, work on a 1d view
     clip_x = np.logical_and(X>clip[0], X<clip[1])
     X = X[clip_x]
 
@@ -339,7 +344,7 @@ def kdensity(X, kernel="gau", bw="normal_reference", weights=None, gridsize=None
         if len(weights) != len(clip_x):
             msg = "The length of the weights must be the same as the given X."
             raise ValueError(msg)
-        weights = weights[clip_x.squeeze()]
+        weights = weights[clip_x]
         q = weights.sum()
 
     # Get kernel object corresponding to selection
@@ -352,33 +357,89 @@ def kdensity(X, kernel="gau", bw="normal_reference", weights=None, gridsize=None
         bw = bandwidths.select_bandwidth(X, bw, kern)
     bw *= adjust
 
-    a = np.min(X,axis=0) - cut*bw
-    b = np.max(X,axis=0) + cut*bw
+    a = np.min(X) - cut*bw
+    b = np.max(X) + cut*bw
     grid = np.linspace(a, b, gridsize)
 
-    k = (X.T - grid[:,None])/bw  # uses broadcasting to make a gridsize x nobs
-
     # set kernel bandwidth
     kern.seth(bw)
 
-    # truncate to domain
-    if kern.domain is not None: # won't work for piecewise kernels like parzen
-        z_lo, z_high = kern.domain
-        domain_mask = (k < z_lo) | (k > z_high)
-        k = kern(k) # estimate density
-        k[domain_mask] = 0
-    else:
-        k = kern(k) # estimate density
+    # the data and the grid are scaled first so that no second temporary of
+    # the size of the kernel array is needed
+    X_scaled = X/bw
+    grid_scaled = grid/bw
+
+    # evaluate the kernel on blocks of grid points so that memory use is
+    # bounded by _kdensity_blocksize instead of gridsize x nobs
+    dens = np.empty(len(grid))
+    step = max(1, _kdensity_blocksize // max(nobs, 1))
+    for start in range(0, len(grid), step):
+        # uses broadcasting to make a block x nobs array
+        k = X_scaled[None,:] - grid_scaled[start:start+step,None]
+
+        # truncate to domain
+        if kern.domain is not None: # won't work for piecewise kernels like parzen
+            z_lo, z_high = kern.domain
+            # build the mask in place to avoid a third block x nobs temporary
+            domain_mask = np.less(k, z_lo)
+            domain_mask |= np.greater(k, z_high)
+            k = kern(k) # estimate density
+            k[domain_mask] = 0
+        else:
+            k = kern(k) # estimate density
+
+        # get rid of any negative values, do we need this?
+        np.maximum(k, 0, out=k)
 
-    k[k<0] = 0 # get rid of any negative values, do we need this?
+        dens[start:start+step] = np.dot(k,weights)
 
-    dens = np.dot(k,weights)/(q*bw)
+    dens /= q*bw
 
     if retgrid:
         return dens, grid, bw
     else:
         return dens, bw
 
+def _kdefft_binned(X, bwmax, gridsize, cut):
+    """
+    Grid and linearly binned data for the FFT density estimators
+
+    X is the data after clipping, the grid extends cut*bwmax past the
+    lowest and highest values of X. Returns the grid, its range and the
+    binned data normalized to sum to 1/delta.
+    """
+    nobs = len(X)
+
+    if gridsize == None:
+        gridsize = np.max((nobs,512.))
+    # round up to the next product of powers of 2, 3 and 5 for the FFT
+    gridsize = _next_regular(int(np.ceil(gridsize)))
+
+    a = np.min(X)-cut*bwmax
+    b = np.max(X)+cut*bwmax
+    grid,delta = np.linspace(a,b,gridsize,retstep=True)
+    RANGE = b-a
+
+#TODO: Fix this?
+# This is the Silverman binning function, but I believe it's buggy (SS)
+# weighting according to Silverman
+#    count = counts(X,grid)
+#    binned = np.zeros_like(grid)    #xi_{k} in Silverman
+#    j = 0
+#    for k in range(int(gridsize-1)):
+#        if count[k]>0: # there are points of X in the grid here
+#            Xingrid = X[j:j+count[k]] # get all these points
+#            # get weights at grid[k],grid[k+1]
+#            binned[k] += np.sum(grid[k+1]-Xingrid)
+#            binned[k+1] += np.sum(Xingrid-grid[k])
+#            j += count[k]
+#    binned /= (nobs)*delta**2 # normalize binned to sum to 1/delta
+
+#NOTE: THE ABOVE IS WRONG, JUST TRY WITH LINEAR BINNING
+    binned = fast_linbin(X,a,b,gridsize)
+    binned /= delta*nobs
+    return grid, RANGE, binned
+
 def kdensityfft(X, kernel="gau", bw="normal_reference", weights=None, gridsize=None,
                 adjust=1, clip=(-np.inf,np.inf), cut=3, retgrid=True):
     """
@@ -408,7 +469,8 @@ def kdensityfft(X, kernel="gau", bw="normal_reference", weights=None, gridsize=N
         also dropped.
     gridsize : int
         If gridsize is None, min(len(X), 512) is used. Note that the provided
-        number is rounded up to the next highest power of 2.
+        number is rounded up to the next number with only 2, 3 and 5
+        as prime factors.
     adjust : float
         An adjustment factor for the bw. Bandwidth becomes bw * adjust.
         clip : tuple
@@ -454,61 +516,112 @@ def kdensityfft(X, kernel="gau", bw="normal_reference", weights=None, gridsize=N
     X = X[np.logical_and(X>clip[0], X<clip[1])] # won't work for two columns.
                                                 # will affect underlying data?
 
-    # Get kernel object corresponding to selection
-    kern = kernel_switch[kernel]()
+    if kernel not in kernel_switch:
+        raise ValueError("Kernel %s not understood" % kernel)
 
     try:
         bw = float(bw)
     except:
+        # the kernel object is only needed to select the bandwidth, the
+        # transform below is specific to the gaussian kernel
+        kern = kernel_switch[kernel]()
         bw = bandwidths.select_bandwidth(X, bw, kern) # will cross-val fit this pattern?
     bw *= adjust
 
-    nobs = len(X) # after trim
-
     # 1 Make grid and discretize the data
-    if gridsize == None:
-        gridsize = np.max((nobs,512.))
-    gridsize = 2**np.ceil(np.log2(gridsize)) # round to next power of 2
-
-    a = np.min(X)-cut*bw
-    b = np.max(X)+cut*bw
-    grid,delta = np.linspace(a,b,gridsize,retstep=True)
-    RANGE = b-a
-
-#TODO: Fix this?
-# This is the Silverman binning function, but I believe it's buggy (SS)
-# weighting according to Silverman
-#    count = counts(X,grid)
-#    binned = np.zeros_like(grid)    #xi_{k} in Silverman
-#    j = 0
-#    for k in range(int(gridsize-1)):
-#        if count[k]>0: # there are points of X in the grid here
-#            Xingrid = X[j:j+count[k]] # get all these points
-#            # get weights at grid[k],grid[k+1]
-#            binned[k] += np.sum(grid[k+1]-Xingrid)
-#            binned[k+1] += np.sum(Xingrid-grid[k])
-#            j += count[k]
-#    binned /= (nobs)*delta**2 # normalize binned to sum to 1/delta
+    grid, RANGE, binned = _kdefft_binned(X, bw, gridsize, cut)
 
-#NOTE: THE ABOVE IS WRONG, JUST TRY WITH LINEAR BINNING
-    binned = fast_linbin(X,a,b,gridsize)/(delta*nobs)
-
-    # step 2 compute FFT of the weights, using Munro (1976) FFT convention
-    y = forrt(binned)
+    # step 2 compute FFT of the weights. The Munro (1976) packing of forrt
+    # and revrt is skipped, the kernel factors are applied directly to the
+    # complex rfft coefficients, which is equivalent.
+    y = _rfft(binned)
 
     # step 3 and 4 for optimal bw compute zstar and the density estimate f
     # don't have to redo the above if just changing bw, ie., for cross val
 
 #NOTE: silverman_transform is the closed form solution of the FFT of the
 #gaussian kernel. Not yet sure how to generalize it.
-    zstar = silverman_transform(bw, gridsize, RANGE)*y # 3.49 in Silverman
-                                                   # 3.50 w Gaussian kernel
-    f = revrt(zstar)
+    zstar = _silverman_factors(bw, len(grid), RANGE)*y # 3.49 in Silverman
+                                                       # 3.50 w Gaussian kernel
+    f = _irfft(zstar, len(binned))
     if retgrid:
         return f, grid, bw
     else:
         return f, bw
 
+def kdensityfft_bw_sweep(X, bws, gridsize=None, adjust=1,
+                         clip=(-np.inf,np.inf), cut=3, retgrid=True):
+    """
+    Gaussian kernel density estimates for several bandwidths from one FFT
+
+    Parameters
+    ----------
+    X : array-like
+        The variable for which the density estimate is desired.
+    bws : array-like
+        The bandwidths for which the density is estimated.
+    gridsize : int
+        If gridsize is None, max(len(X), 512) is used. Note that the provided
+        number is rounded up to the next number with only 2, 3 and 5
+        as prime factors.
+    adjust : float
+        An adjustment factor for the bws. Bandwidths become bws * adjust.
+    clip : tuple
+        Observations in X that are outside of the range given by clip are
+        dropped. The number of observations in X is then shortened.
+    cut : float
+        Defines the length of the grid past the lowest and highest values of X
+        so that the kernel goes to zero. The end points are
+        X.min() - cut*max(bws) and X.max() + cut*max(bws)
+    retgrid : bool
+        Whether or not to return the grid over which the density is estimated.
+
+    Returns
+    -------
+    density : array
+        The densities estimated at the grid points, with one row for each
+        bandwidth in `bws`.
+    grid : array, optional
+        The grid points at which the density is estimated.
+
+    See Also
+    --------
+    kdensityfft
+
+    Notes
+    -----
+    The data is binned and transformed once on a grid that is wide enough
+    for the largest bandwidth. Each bandwidth then only needs a
+    multiplication with the Silverman kernel factors and one inverse FFT,
+    which are done for all bandwidths together. The row for the largest
+    bandwidth is the same as the result of `kdensityfft` with that
+    bandwidth, the other rows differ from `kdensityfft` only by the wider
+    grid.
+    """
+    X = np.asarray(X)
+    X = X[np.logical_and(X>clip[0], X<clip[1])]
+
+    bws = np.asarray(bws, dtype=float)
+    if bws.ndim > 1:
+        raise ValueError("bws must be a scalar or 1d array")
+    bws = np.atleast_1d(bws) * adjust
+    if bws.size == 0:
+        raise ValueError("bws must contain at least one bandwidth")
+
+    grid, RANGE, binned = _kdefft_binned(X, bws.max(), gridsize, cut)
+
+    # the transform of the data does not depend on the bandwidth
+    y = _rfft(binned)
+    # one-off factors, not worth caching for each candidate bandwidth
+    fac = np.array([_silverman_factors(bw, len(grid), RANGE, cache=False)
+                    for bw in bws])
+    zstar = fac*y
+    f = _irfft(zstar, len(binned))
+    if retgrid:
+        return f, grid
+    else:
+        return f
+
 if __name__ == "__main__":
     import numpy as np
     np.random.seed(12345)
@@ -1,15 +1,66 @@
 #### Convenience Functions to be moved to kerneltools ####
 from __future__ import division
-from statsmodels.compat.python import range
+import threading
+from statsmodels.compat.collections import OrderedDict
 import numpy as np
 
+try:
+    # optional, pyFFTW plans are kept in a module-local cache and reused when
+    # the same grid is transformed repeatedly, e.g. cross-validation
+    import pyfftw.builders as _pyfftw_builders
+    from multiprocessing import cpu_count as _cpu_count
+
+    # a plan is taken out of the cache while it runs, so that threads never
+    # share the input and output buffers of one plan
+    _fftw_plans = OrderedDict()
+    _fftw_plans_size = 8
+    _fftw_plans_lock = threading.Lock()
+    # below this many points multithreaded FFTW costs more than it saves
+    _fftw_threads_min_size = 2**15
+
+    def _fftw_execute(builder, x, n):
+        x = np.asarray(x)
+        key = (builder.__name__, x.shape, x.dtype.char, n)
+        with _fftw_plans_lock:
+            plan = _fftw_plans.pop(key, None)
+        if plan is None:
+            threads = _cpu_count() if x.size >= _fftw_threads_min_size else 1
+            plan = builder(x, n, threads=threads)
+        # the plan reuses its output array, return a copy
+        out = plan(x).copy()
+        with _fftw_plans_lock:
+            _fftw_plans[key] = plan
+            while len(_fftw_plans) > _fftw_plans_size:
+                _fftw_plans.popitem(last=False)
+        return out
+
+    def _rfft(x, n=None):
+        return _fftw_execute(_pyfftw_builders.rfft, x, n)
+
+    def _irfft(y, n=None):
+        return _fftw_execute(_pyfftw_builders.irfft, y, n)
+except ImportError:
+    try:
+        # pocketfft in scipy >= 1.4 is faster than numpy.fft and can use
+        # threads
+        from scipy.fft import rfft as _scipy_rfft, irfft as _scipy_irfft
+
+        def _rfft(x, n=None):
+            return _scipy_rfft(x, n, workers=-1)
+
+        def _irfft(y, n=None):
+            return _scipy_irfft(y, n, workers=-1)
+    except ImportError:
+        _rfft = np.fft.rfft
+        _irfft = np.fft.irfft
+
 def forrt(X,m=None):
     """
     RFFT with order like Munro (1976) FORTT routine.
     """
     if m is None:
         m = len(X)
-    y = np.fft.rfft(X,m)/m
+    y = _rfft(X,m)/m
     return np.r_[y.real,y[1:-1].imag]
 
 def revrt(X,m=None):
@@ -19,7 +70,59 @@ def revrt(X,m=None):
     if m is None:
         m = len(X)
     y = X[:m // 2+1] + np.r_[0,X[m // 2 + 1:],0]*1j
-    return np.fft.irfft(y)*m
+    return _irfft(y)*m
+
+# kernel factors are reused when the same (bw, M, RANGE) is requested again,
+# e.g. repeated fits on the same data. The cache is least recently used and
+# bounded by the number of entries and by the total size in bytes.
+_silverman_cache = OrderedDict()
+_silverman_cache_size = 32
+_silverman_cache_bytes = 2**23
+_silverman_cache_nbytes = 0
+_silverman_cache_lock = threading.Lock()
+
+def _silverman_factors(bw, M, RANGE, cache=True):
+    """
+    Multipliers of the Gaussian kernel for the M // 2 + 1 frequencies of rfft.
+
+    Notes
+    -----
+    If `cache` is True, the returned array can be shared with later calls
+    and is read-only. Arrays larger than _silverman_cache_bytes are not
+    cached.
+    """
+    global _silverman_cache_nbytes
+    key = (bw, M, RANGE)
+    if cache:
+        with _silverman_cache_lock:
+            FAC = _silverman_cache.pop(key, None)
+            if FAC is not None:
+                # move to the end, most recently used
+                _silverman_cache[key] = FAC
+                return FAC
+    J2 = np.arange(M // 2 + 1, dtype=float)
+    J2 *= J2
+    FAC1 = 2*(np.pi*bw/RANGE)**2
+    # FAC = exp(-J**2*FAC1)/BC, computed in place
+    FAC = np.multiply(J2, -FAC1)
+    np.exp(FAC, out=FAC)
+    BC = np.multiply(J2, -np.pi**2/(3.*M**2)) # BC = 1 - 1./3 * (J*pi/M)**2
+    BC += 1
+    FAC /= BC
+    if cache and FAC.nbytes <= _silverman_cache_bytes:
+        FAC.flags.writeable = False
+        with _silverman_cache_lock:
+            # another thread may have added the same key in the meantime
+            old = _silverman_cache.pop(key, None)
+            if old is not None:
+                _silverman_cache_nbytes -= old.nbytes
+            _silverman_cache[key] = FAC
+            _silverman_cache_nbytes += FAC.nbytes
+            while (len(_silverman_cache) > _silverman_cache_size or
+                   _silverman_cache_nbytes > _silverman_cache_bytes):
+                _silverman_cache_nbytes -= \
+                    _silverman_cache.popitem(last=False)[1].nbytes
+    return FAC
 
 def silverman_transform(bw, M, RANGE):
     """
@@ -29,12 +132,12 @@ def silverman_transform(bw, M, RANGE):
     -----
     Underflow is intentional as a dampener.
     """
-    J = np.arange(M/2+1)
-    FAC1 = 2*(np.pi*bw/RANGE)**2
-    JFAC = J**2*FAC1
-    BC = 1 - 1./3 * (J*1./M*np.pi)**2
-    FAC = np.exp(-JFAC)/BC
-    kern_est = np.r_[FAC,FAC[1:-1]]
+    FAC = _silverman_factors(bw, M, RANGE)
+    # same factor for the real and imaginary parts in forrt order
+    half = len(FAC)
+    kern_est = np.empty(half + len(FAC[1:-1]))
+    kern_est[:half] = FAC
+    kern_est[half:] = FAC[1:-1]
     return kern_est
 
 def counts(x,v):
@@ -48,9 +151,22 @@ def counts(x,v):
     idx = np.digitize(x,v)
     try: # numpy 1.6
         return np.bincount(idx, minlength=len(v))
-    except:
+    except TypeError: # minlength not supported
         bc = np.bincount(idx)
         return np.r_[bc,np.zeros(len(v)-len(bc))]
 
 def kdesum(x,axis=0):
-    return np.asarray([np.sum(x[i] - x, axis) for i in range(len(x))])
+    """
+    Returns the sums over `axis` of x[i] - x for each i in range(len(x)).
+    """
+    x = np.asarray(x)
+    if axis is None:
+        # sum over all elements of x[i] - x
+        return len(x) * x.reshape(len(x), -1).sum(1) - x.sum()
+    axis = axis % x.ndim
+    if axis == 0:
+        # sum_j (x[i] - x[j]) = n * x[i] - sum_j x[j]
+        return len(x) * x - x.sum(0)
+    # the sum of x[i] - x over axis is s[i] - s with s = x.sum(axis)
+    s = x.sum(axis)
+    return s[:, None] - s
@@ -9,7 +9,6 @@ cimport numpy as np
 import numpy as np
 
 ctypedef np.float64_t DOUBLE
-ctypedef np.int_t INT
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
@@ -17,22 +16,44 @@ ctypedef np.int_t INT
 def fast_linbin(np.ndarray[DOUBLE] X, double a, double b, int M, int trunc=1):
     """
     Linear Binning as described in Fan and Marron (1994)
+
+    Parameters
+    ----------
+    X : ndarray
+        The data, 1d float64.
+    a, b : float
+        The lowest and highest grid point.
+    M : int
+        The number of grid points.
+    trunc : int
+        Ignored, kept only for backwards compatibility. Observations that
+        fall outside of the grid are always dropped.
+
+    Returns
+    -------
+    gcnts : ndarray
+        The binned counts at the M grid points.
+
+    Notes
+    -----
+    The fractional split and the scatter into the grid counts are done in a
+    single pass over `X`, no temporary arrays of length `nobs` are created.
+    The GIL is released during the loop, so several data sets can be binned
+    concurrently from different threads.
     """
     cdef:
         Py_ssize_t i, li_i
-        int nobs = X.shape[0]
+        Py_ssize_t nobs = X.shape[0]
         double delta = (b - a)/(M - 1)
+        double lxi, rem
         np.ndarray[DOUBLE] gcnts = np.zeros(M, np.float)
-        np.ndarray[DOUBLE] lxi = (X - a)/delta
-        np.ndarray[INT] li = lxi.astype(int)
-        np.ndarray[DOUBLE] rem = lxi - li
-
 
-    for i in range(nobs):
-        li_i = li[i]
-        if li_i > 1 and li_i < M:
-            gcnts[li_i] = gcnts[li_i] + 1 - rem[i]
-            gcnts[li_i+1] = gcnts[li_i+1] + rem[i]
-        if li_i > M and trunc == 0:
-            gcnts[M] = gcnts[M] + 1
+    with nogil:
+        for i in range(nobs):
+            lxi = (X[i] - a)/delta
+            li_i = <Py_ssize_t>lxi
+            rem = lxi - li_i
+            if li_i > 1 and li_i < M - 1:
+                gcnts[li_i] += 1 - rem
+                gcnts[li_i+1] += rem
     return gcnts
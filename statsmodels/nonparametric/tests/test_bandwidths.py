@@ -40,6 +40,20 @@ class TestBandwidthCalculation(object):
 
         assert_allclose(bw_expected, bw_calc)
 
+    def test_calculate_bandwidth_columns(self):
+        # one bandwidth per column, the same as for each column separately
+        X = np.column_stack((Xi, 2 * Xi[::-1] + 1))
+        kern = kernels.Gaussian()
+
+        for bw in ['scott', 'silverman', 'normal_reference']:
+            bw_calc = select_bandwidth(X, bw, kern)
+            bw_expected = [select_bandwidth(X[:, 0], bw, kern),
+                           select_bandwidth(X[:, 1], bw, kern)]
+            assert_allclose(bw_calc, bw_expected)
+
+            bw_calc = select_bandwidth(X.T, bw, kern, axis=1)
+            assert_allclose(bw_calc, bw_expected)
+
 
 class CheckNormalReferenceConstant(object):
 
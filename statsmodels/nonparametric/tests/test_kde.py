@@ -5,6 +5,8 @@ from nose.tools import raises
 import numpy as np
 from statsmodels.distributions.mixture_rvs import mixture_rvs
 from statsmodels.nonparametric.kde import KDEUnivariate as KDE
+from statsmodels.nonparametric import kde
+from statsmodels.nonparametric.kde import kdensityfft, kdensityfft_bw_sweep
 import statsmodels.sandbox.nonparametric.kernels as kernels
 from scipy import stats
 
@@ -58,6 +60,10 @@ class TestKDEExceptions(object):
         self.kde.fit(kernel="epa", gridsize=50, fft=True,
                     bw="silverman")
 
+    @raises(ValueError)
+    def test_unknown_kernel_fft_exception(self):
+        kdensityfft(Xi, kernel="nope", bw=0.3)
+
 class CheckKDE(object):
 
     decimal_density = 7
@@ -189,6 +195,77 @@ class TestKDEGaussFFT(CheckKDE):
         rfname2 = os.path.join(curdir,'results','results_kde_fft.csv')
         cls.res_density = np.genfromtxt(open(rfname2, 'rb'))
 
+class TestKDEBlocks(object):
+    # kdensity evaluates the kernel in blocks of grid points, a small block
+    # size forces many blocks, the results have to match a single block
+
+    def check_blocks(self, **kwds):
+        res1 = kde.kdensity(Xi, **kwds)
+        blocksize = kde._kdensity_blocksize
+        kde._kdensity_blocksize = 500
+        try:
+            res2 = kde.kdensity(Xi, **kwds)
+        finally:
+            kde._kdensity_blocksize = blocksize
+        npt.assert_allclose(res2[0], res1[0], rtol=1e-13, atol=1e-15)
+        npt.assert_allclose(res2[1], res1[1])
+
+    def test_gauss(self):
+        self.check_blocks(kernel="gau", bw="silverman")
+
+    def test_epa(self):
+        self.check_blocks(kernel="epa", bw="silverman")
+
+    def test_weights(self):
+        weights = np.linspace(1, 100, 200)
+        self.check_blocks(kernel="gau", bw="silverman", weights=weights)
+        self.check_blocks(kernel="epa", bw="silverman", weights=weights)
+
+    def test_clip(self):
+        weights = np.linspace(1, 100, 200)
+        self.check_blocks(kernel="gau", bw="silverman", clip=(-1, 1.5))
+        self.check_blocks(kernel="epa", bw="silverman", clip=(-1, 1.5),
+                          weights=weights)
+
+
+class TestKDEFFTBandwidthSweep(object):
+    @classmethod
+    def setupClass(cls):
+        cls.bws = [0.1, 0.25, 0.4]
+        cls.density, cls.grid = kdensityfft_bw_sweep(Xi, cls.bws)
+
+    def test_shape(self):
+        npt.assert_equal(self.density.shape, (len(self.bws), 512))
+
+    def test_integrates_to_one(self):
+        delta = self.grid[1] - self.grid[0]
+        npt.assert_allclose(self.density.sum(1) * delta, 1, rtol=1e-8)
+
+    def test_largest_bw_matches_kdensityfft(self):
+        # the common grid is the one of the largest bandwidth
+        res, grid, bw = kdensityfft(Xi, kernel="gau", bw=self.bws[-1])
+        npt.assert_allclose(self.grid, grid)
+        npt.assert_allclose(self.density[-1], res, atol=1e-12)
+
+    def test_smaller_bws_match_kdensity(self):
+        # direct estimate on the same grid, the differences come from the
+        # linear binning
+        bwmax = self.bws[-1]
+        for i, bw in enumerate(self.bws[:-1]):
+            res, grid, _ = kde.kdensity(Xi, kernel="gau", bw=bw,
+                                        gridsize=len(self.grid),
+                                        cut=3 * bwmax / bw)
+            npt.assert_allclose(grid, self.grid)
+            npt.assert_allclose(self.density[i], res, atol=2e-3)
+
+    @raises(ValueError)
+    def test_empty_bws_exception(self):
+        kdensityfft_bw_sweep(Xi, [])
+
+    @raises(ValueError)
+    def test_2d_bws_exception(self):
+        kdensityfft_bw_sweep(Xi, [[0.1, 0.2], [0.3, 0.4]])
+
 class CheckKDEWeights(object):
 
     @classmethod
@@ -0,0 +1,32 @@
+import numpy as np
+import numpy.testing as npt
+from statsmodels.nonparametric.kdetools import kdesum
+
+
+def kdesum_loop(x, axis=0):
+    # reference implementation, one reduction for each observation
+    return np.asarray([np.sum(x[i] - x, axis) for i in range(len(x))])
+
+
+class TestKdesum(object):
+
+    @classmethod
+    def setupClass(cls):
+        np.random.seed(12345)
+        cls.x1 = np.random.randn(20)
+        cls.x2 = np.random.randn(20, 3)
+
+    def test_1d(self):
+        for axis in [0, -1, None]:
+            npt.assert_allclose(kdesum(self.x1, axis),
+                                kdesum_loop(self.x1, axis), atol=1e-12)
+
+    def test_2d(self):
+        for axis in [0, 1, -1, None]:
+            npt.assert_allclose(kdesum(self.x2, axis),
+                                kdesum_loop(self.x2, axis), atol=1e-12)
+
+
+if __name__ == "__main__":
+    import nose
+    nose.runmodule(argv=[__file__, '-vvs', '-x', '--pdb'], exit=False)